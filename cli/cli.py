@@ -1,25 +1,153 @@
 import sqlite3
 import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Connection-level tuning applied to every connection we open. WAL lets the
+# chat loop's writes and the stats reads proceed without blocking each other,
+# and synchronous=NORMAL drops one of the two fsyncs per commit.
+# auto_vacuum only takes effect on a brand new database, and must come
+# before journal_mode=WAL writes the file header.
+SQLITE_PRAGMAS = (
+    'PRAGMA auto_vacuum=INCREMENTAL',
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Seconds to wait before writing queued messages, so a burst of messages
+# shares one transaction (and one fsync) instead of committing per row
+MESSAGE_FLUSH_DELAY = 0.25
+
+# Re-run ANALYZE at startup once the message count has drifted this far
+# (as a fraction) from the count at the last ANALYZE
+ANALYZE_DRIFT = 0.25
+
+# Primary result codes of write failures that can clear on their own, e.g.
+# another connection holding the write lock. Flushes that fail with anything
+# else (constraint violations, bad parameters) would fail again on retry.
+RETRYABLE_SQLITE_ERRORS = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+# Seconds get_db_stats() may return a cached result. Writes made through the
+# manager drop the cache straight away, so this only delays noticing writes
+# from other connections.
+STATS_CACHE_TTL = 5.0
+
+# Kept as a single constant string so SQLite's statement cache reuses the
+# compiled statement across flushes
+INSERT_MESSAGE_SQL = 'INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)'
+# Messages reference conversations, so make sure the parent row exists first
+ENSURE_CONVERSATION_SQL = 'INSERT OR IGNORE INTO conversations (id) VALUES (?)'
+UPSERT_CONVERSATION_SQL = '''
+    INSERT INTO conversations (id, title) VALUES (?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        updated_at = CURRENT_TIMESTAMP,
+        title = COALESCE(excluded.title, conversations.title)
+'''
 
 class ConversationManager:
     """Manages conversation storage and retrieval using SQLite database"""
     
     def __init__(self, db_path: Path):
         self.db_path = db_path
-        self._ensure_database_exists()
+        # One long-lived connection, only ever used from a single worker
+        # thread, so each call skips the open/schema-parse cost and keeps
+        # SQLite's page cache warm
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='conversation-db')
+        if str(self.db_path) != ':memory:':
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Opened on the database thread by the first call, since migrating
+        # and analyzing a large database would otherwise block the caller's
+        # event loop (see _call)
+        self._conn: Optional[sqlite3.Connection] = None
+        # Messages queued by save_message() waiting for the next flush
+        self._pending: List[Tuple[str, str, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Future] = None
+        # (monotonic time taken, stats) from the last get_db_stats() call
+        self._stats_cache: Optional[Tuple[float, dict]] = None
+        # Bumped by every write, so stats read before a write aren't cached after it
+        self._stats_version = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the standard pragmas applied"""
+        # Autocommit mode - transactions are managed explicitly by _transaction()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        # Needed for ON DELETE CASCADE from conversations to messages
+        conn.execute('PRAGMA foreign_keys=ON')
+        # WAL is not available for in-memory databases
+        if str(self.db_path) != ':memory:':
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the enclosed statements as a single write transaction"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._conn.cursor()
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+    
+    def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func on the database thread, opening the database on first use"""
+        if self._conn is None:
+            conn = self._connect()
+            self._conn = conn
+            try:
+                self._ensure_database_exists()
+            except BaseException:
+                # Leave it unopened so the next call tries again
+                self._conn = None
+                conn.close()
+                raise
+        return func(*args)
+    
+    def _run(self, func: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Schedule func on the database thread, which owns the connection"""
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, self._call, func, *args)
+    
+    async def _submit(self, sql: str, params: tuple = ()) -> list:
+        """Run a read query on the database thread and return all rows"""
+        return await self._run(lambda: self._conn.execute(sql, params).fetchall())
+    
+    def _messages_table_needs_rebuild(self) -> bool:
+        """Check for a messages table created before ON DELETE CASCADE"""
+        # Columns: id, seq, table, from, to, on_update, on_delete, match
+        foreign_keys = self._conn.execute('PRAGMA foreign_key_list(messages)').fetchall()
+        return any(fk[6] != 'CASCADE' for fk in foreign_keys)
     
     def _ensure_database_exists(self):
         """Create database and tables if they don't exist"""
-        # Create directory if it doesn't exist
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # SQLite can't alter a foreign key, so older databases get their
+        # messages table rebuilt. Foreign keys must be off while doing so.
+        rebuild_messages = self._messages_table_needs_rebuild()
+        if rebuild_messages:
+            self._conn.execute('PRAGMA foreign_keys=OFF')
+        try:
+            self._create_tables(rebuild_messages)
+        finally:
+            if rebuild_messages:
+                self._conn.execute('PRAGMA foreign_keys=ON')
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
+        self._analyze_if_stale()
+    
+    def _create_tables(self, rebuild_messages: bool):
+        """Create tables and indexes, rebuilding messages if requested"""
+        with self._transaction() as cursor:
             # Create conversations table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS conversations (
@@ -31,7 +159,10 @@ class ConversationManager:
                 )
             ''')
             
-            # Create messages table
+            if rebuild_messages:
+                cursor.execute('ALTER TABLE messages RENAME TO messages_old')
+            
+            # Create messages table - deleting a conversation deletes its messages
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS messages (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,154 +170,292 @@ class ConversationManager:
                     role TEXT NOT NULL,
                     content TEXT NOT NULL,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+                    FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
                 )
             ''')
             
-            # Create index for better performance
+            if rebuild_messages:
+                cursor.execute('''
+                    INSERT INTO messages (id, conversation_id, role, content, timestamp)
+                    SELECT id, conversation_id, role, content, timestamp FROM messages_old
+                ''')
+                # Give orphaned messages a parent so the foreign key holds
+                cursor.execute('''
+                    INSERT OR IGNORE INTO conversations (id)
+                    SELECT DISTINCT conversation_id FROM messages
+                    WHERE conversation_id IS NOT NULL
+                ''')
+                # Drops the old indexes along with the table
+                cursor.execute('DROP TABLE messages_old')
+            
+            # Composite index so fetching a conversation is an index-ordered
+            # scan with no separate sort step. It also covers lookups by
+            # conversation_id alone, which makes the old single-column index
+            # redundant.
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_conversation_id 
-                ON messages(conversation_id)
+                CREATE INDEX IF NOT EXISTS idx_messages_conv_ts
+                ON messages(conversation_id, timestamp)
             ''')
+            cursor.execute('DROP INDEX IF EXISTS idx_conversation_id')
             
-            conn.commit()
+            # Lets list_conversations page by (updated_at, id) without sorting
+            # or skipping over earlier pages. Replaces idx_conv_updated, whose
+            # id column sorted the wrong way for the keyset cursor.
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_conv_updated_id
+                ON conversations(updated_at DESC, id DESC)
+            ''')
+            cursor.execute('DROP INDEX IF EXISTS idx_conv_updated')
+            
+            # Bookkeeping for maintenance, e.g. when ANALYZE last ran
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+    
+    def _analyze(self, message_count: Optional[int] = None):
+        """Refresh query planner statistics and record when they were taken"""
+        if message_count is None:
+            message_count = self._conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        self._conn.execute('ANALYZE')
+        self._conn.execute('''
+            INSERT INTO meta (key, value) VALUES ('analyzed_message_count', ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (str(message_count),))
+    
+    def _analyze_if_stale(self):
+        """Run ANALYZE if it never ran or the data has changed noticeably since"""
+        has_stats = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'analyzed_message_count'"
+        ).fetchone()
+        message_count = self._conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        
+        if has_stats and row:
+            analyzed_count = int(row[0])
+            if abs(message_count - analyzed_count) <= analyzed_count * ANALYZE_DRIFT:
+                return
+        self._analyze(message_count)
     
     async def save_id(self, conversation_id: str, title: Optional[str] = None):
         """Save or update a conversation ID"""
         def _save():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Check if conversation exists
-                cursor.execute(
-                    'SELECT id FROM conversations WHERE id = ?', 
-                    (conversation_id,)
-                )
-                
-                if cursor.fetchone():
-                    # Update existing conversation
-                    cursor.execute('''
-                        UPDATE conversations 
-                        SET updated_at = CURRENT_TIMESTAMP, title = COALESCE(?, title)
-                        WHERE id = ?
-                    ''', (title, conversation_id))
-                else:
-                    # Insert new conversation
-                    cursor.execute('''
-                        INSERT INTO conversations (id, title)
-                        VALUES (?, ?)
-                    ''', (conversation_id, title))
-                
-                conn.commit()
-        
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _save)
+            # Single UPSERT - no SELECT round trip and no race between the
+            # existence check and the write
+            with self._transaction() as cursor:
+                cursor.execute(UPSERT_CONVERSATION_SQL, (conversation_id, title))
+        
+        # Run on the database thread to avoid blocking
+        self._invalidate_stats()
+        await self._run(_save)
     
     async def get_last_id(self) -> Optional[str]:
         """Get the most recently updated conversation ID"""
-        def _get_last():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id FROM conversations 
-                    ORDER BY updated_at DESC 
-                    LIMIT 1
-                ''')
-                result = cursor.fetchone()
-                return result[0] if result else None
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_last)
+        rows = await self._submit('''
+            SELECT id FROM conversations 
+            ORDER BY updated_at DESC, id DESC
+            LIMIT 1
+        ''')
+        return rows[0][0] if rows else None
     
     async def save_message(self, conversation_id: str, role: str, content: str):
-        """Save a message to the database"""
-        def _save_message():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO messages (conversation_id, role, content)
-                    VALUES (?, ?, ?)
-                ''', (conversation_id, role, content))
-                conn.commit()
+        """Queue a message to be saved with the next batched write"""
+        self._pending.append((conversation_id, role, content))
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(MESSAGE_FLUSH_DELAY, self._flush)
+    
+    def _flush(self) -> Optional[asyncio.Future]:
+        """Hand all queued messages to the database thread as one transaction"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return self._flush_task
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _save_message)
+        pending, self._pending = self._pending, []
+        self._invalidate_stats()
+        
+        def _save_messages():
+            with self._transaction() as cursor:
+                # id is a TEXT PRIMARY KEY, which accepts NULL - skip those or
+                # every flush would add a phantom conversation
+                cursor.executemany(
+                    ENSURE_CONVERSATION_SQL,
+                    {(row[0],) for row in pending if row[0] is not None}
+                )
+                cursor.executemany(INSERT_MESSAGE_SQL, pending)
+        
+        task = self._run(_save_messages)
+        task.add_done_callback(lambda done: self._flush_done(done, pending))
+        self._flush_task = task
+        return task
+    
+    def _flush_done(self, task: asyncio.Future, rows: List[Tuple[str, str, str]]):
+        """Forget a finished flush, and requeue its rows if the write may succeed later"""
+        if self._flush_task is task:
+            self._flush_task = None
+        # Retrieving the exception here also keeps asyncio from reporting it
+        # as never retrieved when the flush was started by the timer
+        error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+        if error is None:
+            return
+        if (isinstance(error, sqlite3.OperationalError)
+                and error.sqlite_errorcode & 0xFF in RETRYABLE_SQLITE_ERRORS):
+            logger.warning('Failed to save %d queued messages, will retry on next flush: %s', len(rows), error)
+            # Ahead of messages queued since, though a flush that was already
+            # submitted may still commit its rows first
+            self._pending[:0] = rows
+            return
+        # Retrying would fail the same way and block every later flush
+        logger.error('Dropping %d queued messages that could not be saved: %s', len(rows), error)
+    
+    async def flush(self):
+        """Write any queued messages now and wait until they are committed"""
+        task = self._flush()
+        if task is not None:
+            await task
+    
+    async def _settle(self):
+        """Write queued messages before a read or delete, without failing it
+        
+        A failed flush has already been logged (and requeued if retryable) by
+        _flush_done(), and has nothing to do with the caller's own statement.
+        """
+        task = self._flush()
+        if task is not None:
+            await asyncio.wait([task])
     
     async def get_conversation_messages(self, conversation_id: str) -> list:
         """Get all messages for a conversation"""
-        def _get_messages():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT role, content, timestamp
-                    FROM messages
-                    WHERE conversation_id = ?
-                    ORDER BY timestamp ASC
-                ''', (conversation_id,))
-                return cursor.fetchall()
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_messages)
+        await self._settle()
+        return await self._submit('''
+            SELECT role, content, timestamp
+            FROM messages
+            WHERE conversation_id = ?
+            ORDER BY timestamp ASC
+        ''', (conversation_id,))
     
-    async def list_conversations(self, limit: int = 50) -> list:
-        """List recent conversations"""
-        def _list_conversations():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, title, created_at, updated_at
-                    FROM conversations
-                    ORDER BY updated_at DESC
-                    LIMIT ?
-                ''', (limit,))
-                return cursor.fetchall()
+    async def list_conversations(self, limit: int = 50, before: Optional[Tuple[str, str]] = None) -> list:
+        """List recent conversations
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _list_conversations)
+        Pass (updated_at, id) of the last row of a page as `before` to get the
+        next page (keyset pagination, so deep pages cost the same as the first).
+        The id breaks ties between conversations updated in the same second.
+        """
+        if before is None:
+            return await self._submit('''
+                SELECT id, title, created_at, updated_at
+                FROM conversations
+                ORDER BY updated_at DESC, id DESC
+                LIMIT ?
+            ''', (limit,))
+        return await self._submit('''
+            SELECT id, title, created_at, updated_at
+            FROM conversations
+            WHERE (updated_at, id) < (?, ?)
+            ORDER BY updated_at DESC, id DESC
+            LIMIT ?
+        ''', (*before, limit))
     
     async def delete_conversation(self, conversation_id: str):
         """Delete a conversation and all its messages"""
+        # Queued messages must land before the delete or they would be orphaned
+        await self._settle()
+        
         def _delete():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Delete messages first (foreign key constraint)
-                cursor.execute(
-                    'DELETE FROM messages WHERE conversation_id = ?', 
-                    (conversation_id,)
-                )
-                
-                # Delete conversation
+            # Messages go with it via ON DELETE CASCADE
+            with self._transaction() as cursor:
                 cursor.execute(
                     'DELETE FROM conversations WHERE id = ?', 
                     (conversation_id,)
                 )
-                
-                conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _delete)
+        self._invalidate_stats()
+        await self._run(_delete)
+    
+    async def maintenance(self):
+        """Return free pages to the filesystem and refresh planner statistics"""
+        await self._settle()
+        
+        def _maintain():
+            # executescript steps the pragma to completion; execute() would
+            # only free a single page
+            self._conn.executescript('PRAGMA incremental_vacuum;')
+            self._analyze()
+        
+        await self._run(_maintain)
+    
+    def _invalidate_stats(self):
+        """Drop cached stats ahead of a write through this manager"""
+        self._stats_cache = None
+        self._stats_version += 1
+    
+    def _cached_stats(self) -> Optional[dict]:
+        """Stats from the cache if they are still fresh"""
+        if self._stats_cache is not None:
+            taken_at, stats = self._stats_cache
+            if time.monotonic() - taken_at < STATS_CACHE_TTL:
+                return stats
+        return None
+    
+    def _read_db_stats(self) -> dict:
+        """Count rows and measure the file - runs on the database thread"""
+        # Both counts in one statement
+        conversation_count, message_count = self._conn.execute(
+            'SELECT (SELECT COUNT(*) FROM conversations), (SELECT COUNT(*) FROM messages)'
+        ).fetchone()
+        
+        # Get database size
+        db_size = self.db_path.stat().st_size if self.db_path.exists() else 0
+        
+        return {
+            'conversations': conversation_count,
+            'messages': message_count,
+            'db_size_bytes': db_size,
+            'db_path': str(self.db_path)
+        }
+    
+    def _store_stats(self, stats: dict, version: int):
+        """Cache stats unless a write was made while they were being read"""
+        if version == self._stats_version:
+            self._stats_cache = (time.monotonic(), stats)
     
     def get_db_stats(self) -> dict:
-        """Get database statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Get conversation count
-            cursor.execute('SELECT COUNT(*) FROM conversations')
-            conversation_count = cursor.fetchone()[0]
-            
-            # Get message count
-            cursor.execute('SELECT COUNT(*) FROM messages')
-            message_count = cursor.fetchone()[0]
-            
-            # Get database size
-            db_size = self.db_path.stat().st_size if self.db_path.exists() else 0
-            
-            return {
-                'conversations': conversation_count,
-                'messages': message_count,
-                'db_size_bytes': db_size,
-                'db_path': str(self.db_path)
-            }
+        """Get database statistics, cached for up to STATS_CACHE_TTL seconds
+        
+        Blocks the calling thread until the database thread gets to it, i.e.
+        behind any queued flush. From async code use get_db_stats_async().
+        """
+        stats = self._cached_stats()
+        if stats is None:
+            version = self._stats_version
+            # The connection belongs to the database thread, so hop over and wait
+            stats = self._executor.submit(self._call, self._read_db_stats).result()
+            self._store_stats(stats, version)
+        return stats
+    
+    async def get_db_stats_async(self) -> dict:
+        """Get database statistics without blocking the event loop"""
+        stats = self._cached_stats()
+        if stats is None:
+            version = self._stats_version
+            stats = await self._run(self._read_db_stats)
+            self._store_stats(stats, version)
+        return stats
+    
+    async def close(self):
+        """Flush queued messages, close the connection and stop the database thread"""
+        await self._settle()
+        
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+        
+        # Straight to the executor - there is no point opening it just to close it
+        await asyncio.get_event_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=True)
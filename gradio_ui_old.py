@@ -1,9 +1,12 @@
 import uuid
 import os
+import re
 import gradio as gr
 import asyncio
+import time
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Any, TypedDict, Annotated, Generator
+from typing import Dict, Any, TypedDict, Annotated, Generator, Deque, Optional, Tuple
 from datetime import datetime
 
 from langchain.chat_models import init_chat_model
@@ -19,6 +22,12 @@ from mcp_client.mcp_server_util import verify_uvx_installation, verify_npx_insta
 from dotenv import load_dotenv
 
 SQLITE_DB = Path("conversation_db/conversations.db")
+# Minimum seconds between streamed UI updates - chunks in between are coalesced
+STREAM_UPDATE_INTERVAL = 0.05
+# How raw tool output echoed into a response begins (the repr of MCP content)
+TOOL_OUTPUT_STARTS = ("[TextContent(", "[ImageContent(", "[EmbeddedResource(")
+# Characters of suspected tool output to hold back before giving up and showing it
+TOOL_OUTPUT_MAX_BUFFER = 20000
 
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
@@ -27,6 +36,15 @@ class AgentState(TypedDict):
 
 
 class GradioMCPInterface:
+    # End of raw tool output echoed into a response, e.g. "[TextContent(... text='...')]"
+    # or "[TextContent(..., annotations=None, meta=None)]" from newer mcp versions
+    _TOOL_OUTPUT_END_RE = re.compile(r"\)\]")
+    # Deterministic, so built once rather than on every agent init
+    _AGENT_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", "You are a helpful AI assistant with access to various tools."),
+        ("placeholder", "{messages}")
+    ])
+
     def __init__(self, config_path: Path):
         self.config_path = config_path
         self.mcp_manager = MCPClientManager(config_path)
@@ -34,10 +52,26 @@ class GradioMCPInterface:
         self.agent_executor: bool = None
         self.debug_enabled: bool = True
         self.initialized: bool = False
-        self._debug_logs: List[str] = []
+        # Keep only the last 1000 logs, plus the last 50 for display
+        self._debug_logs: Deque[str] = deque(maxlen=1000)
+        self._recent_debug_logs: Deque[str] = deque(maxlen=50)
+        # Joined display text, rebuilt only after a new log entry
+        self._debug_cache: Optional[str] = None
+        self._debug_cache_dirty: bool = True
+        # Date/time prefix for log timestamps, reformatted once per second
+        self._log_sec: int = 0
+        self._log_sec_str: str = ''
         self.current_model: str = ''
         self.current_temperature: float = None
+        # Chat models by (model, temperature), so switching back and forth
+        # reuses the existing client and its warm connection pool
+        self._llm_cache: Dict[Tuple[str, float], Any] = {}
+        # React agents by (model, temperature, tool names) - tools rarely
+        # change at runtime, so the graph only needs building once per config.
+        # Cleared whenever the MCP manager (re)initializes its clients
+        self._agent_cache: Dict[Tuple[str, float, Tuple[str, ...]], Any] = {}
         load_dotenv()
+        self._api_key = os.getenv('OPENAI_API_KEY')
         print(f"Initialized with config path: {config_path}")
 
     async def initialize(self):
@@ -45,18 +79,27 @@ class GradioMCPInterface:
         if not self.initialized:
             try:
                 print("Starting initialization...")
-                if not await verify_python_installation():
+                # Independent subprocess probes - run them concurrently
+                python_ok, uvx_ok, npx_ok = await asyncio.gather(
+                    verify_python_installation(),
+                    verify_uvx_installation(),
+                    verify_npx_installation(),
+                )
+                if not python_ok:
                     raise RuntimeError("Failed to verify Python installation")
 
-                if not await verify_uvx_installation():
+                if not uvx_ok:
                     raise RuntimeError("Failed to verify UVX installation")
 
-                if not await verify_npx_installation():
+                if not npx_ok:
                     raise RuntimeError("Failed to verify NPX installation")
 
                 print("Standard MCP STDIO Commands Verified, initializing MCP manager...")
                 try:
                     await self.mcp_manager.initialize()
+                    # Cached agents hold tools bound to the clients the manager
+                    # just replaced, so they must be rebuilt
+                    self._agent_cache.clear()
                 except Exception as e:
                     print(f"Error in MCP manager initialization: {str(e)}")  # Debug print
                     self._log(f"MCP manager initialization failed: {str(e)}", "ERROR")
@@ -74,38 +117,50 @@ class GradioMCPInterface:
     def _log(self, message: str, level: str = "INFO") -> None:
         """Add a log message if debug mode is enabled"""
         if self.debug_enabled:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            log_entry = f"[{timestamp}] {level}: {message}"
+            t = time.time()
+            sec = int(t)
+            if sec != self._log_sec:
+                self._log_sec = sec
+                self._log_sec_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+            log_entry = f"[{self._log_sec_str}.{int((t - sec) * 1000):03d}] {level}: {message}"
             self._debug_logs.append(log_entry)
-            # Keep only last 1000 logs
-            self._debug_logs = self._debug_logs[-1000:]
+            self._recent_debug_logs.append(log_entry)
+            self._debug_cache_dirty = True
 
     def _format_debug_logs(self) -> str:
         """Format debug logs for display"""
         if not self.debug_enabled:
             return "Debug mode disabled"
-        return "\n".join(self._debug_logs[-50:])  # Show last 50 logs
+        if self._debug_cache_dirty or self._debug_cache is None:
+            self._debug_cache = "\n".join(self._recent_debug_logs)
+            self._debug_cache_dirty = False
+        return self._debug_cache
 
     def _format_history(self, history: list) -> list:
         """Format chat history into consistent structure"""
-        formatted_history = []
-        for entry in history:
-            if isinstance(entry, list) and len(entry) == 2:
-                formatted_history.extend([
-                    {"role": "user", "content": entry[0]},
-                    {"role": "assistant", "content": entry[1]}
-                ])
-        return formatted_history
+        # The Chatbot uses type="messages", so history normally arrives as
+        # role/content dicts already - pass it through untouched
+        if history and isinstance(history[0], dict):
+            return history
+        return [
+            {"role": role, "content": content}
+            for entry in history
+            if isinstance(entry, list) and len(entry) == 2
+            for role, content in zip(("user", "assistant"), entry)
+        ]
 
     def _init_llm(self, model: str = "gpt-4", temperature: float = 0) -> None:
         """Initialize or update LLM configuration"""
         try:
-            api_key = os.getenv('OPENAI_API_KEY')
-            self.llm = init_chat_model(
-                model=model,
-                temperature=temperature,
-                api_key=api_key
-            )
+            llm = self._llm_cache.get((model, temperature))
+            if llm is None:
+                llm = init_chat_model(
+                    model=model,
+                    temperature=temperature,
+                    api_key=self._api_key
+                )
+                self._llm_cache[(model, temperature)] = llm
+            self.llm = llm
             self.current_model = model
             self.current_temperature = temperature
             if self.llm:
@@ -127,17 +182,17 @@ class GradioMCPInterface:
             self._log("No tools available for agent", "WARNING")
             return
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful AI assistant with access to various tools."),
-            ("placeholder", "{messages}")
-        ])
-
-        self.agent_executor = create_react_agent(
-            self.llm,
-            tools,
-            state_schema=AgentState,
-            state_modifier=prompt,
-        )
+        key = (self.current_model, self.current_temperature, tuple(t.name for t in tools))
+        agent = self._agent_cache.get(key)
+        if agent is None:
+            agent = create_react_agent(
+                self.llm,
+                tools,
+                state_schema=AgentState,
+                state_modifier=self._AGENT_PROMPT,
+            )
+            self._agent_cache[key] = agent
+        self.agent_executor = agent
 
     async def chat(
             self,
@@ -191,7 +246,16 @@ class GradioMCPInterface:
         }
 
         current_response = ""
-        formatted_history = self._format_history(history)
+        # Raw tool output can span several chunks - hold it back until its end
+        # marker arrives, then strip it once for the whole stream
+        tool_buffer = ""
+        # Build the history once; only the assistant entry changes while streaming
+        new_history = self._format_history(history) + [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": current_response}
+        ]
+        last_yield = time.monotonic()
+        pending_update = False
 
         try:
             async for chunk in self.agent_executor.astream(
@@ -210,18 +274,33 @@ class GradioMCPInterface:
                         else:
                             # Filter out raw tool output and any trailing characters
                             content = message_chunk.content
-                            if content.startswith('['):
-                                # Find the end of the raw output by looking for ")]'"
-                                end_marker = "')]"
-                                if end_marker in content:
-                                    content = content[content.find(end_marker) + len(end_marker):]
+                            if tool_buffer or content.startswith('['):
+                                # Only the seam with the previous chunks needs rescanning -
+                                # the character before it could start the end marker
+                                search_start = max(len(tool_buffer) - 1, 0)
+                                tool_buffer += content
+                                content = ""
+                                if tool_buffer.startswith(TOOL_OUTPUT_STARTS):
+                                    match = self._TOOL_OUTPUT_END_RE.search(tool_buffer, search_start)
+                                    if match is not None:
+                                        content = tool_buffer[match.end():]
+                                        tool_buffer = ""
+                                    elif len(tool_buffer) > TOOL_OUTPUT_MAX_BUFFER:
+                                        # Never closed - stop holding the reply back
+                                        content, tool_buffer = tool_buffer, ""
+                                elif not any(start.startswith(tool_buffer) for start in TOOL_OUTPUT_STARTS):
+                                    # Ordinary text that happens to start with "[", e.g. a
+                                    # markdown link or a citation - let it stream as usual
+                                    content, tool_buffer = tool_buffer, ""
                             current_response += content
-                        new_history = formatted_history + [
-                            {"role": "user", "content": message},
-                            {"role": "assistant", "content": current_response}
-                        ]
-                        # Use self._format_debug_logs() instead of getting from manager
-                        yield "", new_history, self._format_debug_logs()
+                        new_history[-1]["content"] = current_response
+                        pending_update = True
+                        now = time.monotonic()
+                        if now - last_yield > STREAM_UPDATE_INTERVAL:
+                            last_yield = now
+                            pending_update = False
+                            # Use self._format_debug_logs() instead of getting from manager
+                            yield "", new_history, self._format_debug_logs()
 
                 elif isinstance(chunk, tuple) and chunk[0] == "values":
                     tool_message = chunk[1]['messages'][-1]
@@ -231,6 +310,16 @@ class GradioMCPInterface:
                                 self._log(f"Tool Call: {tool_call['name']} - ID: {tool_call['id']}", "TOOL")
                                 self._log(f"Arguments: {tool_call['args']}", "TOOL")
 
+                    # Push any coalesced content before the agent moves to its next step
+                    if pending_update:
+                        last_yield = time.monotonic()
+                        pending_update = False
+                        yield "", new_history, self._format_debug_logs()
+
+            # Text that looked like tool output but never closed is real content
+            if tool_buffer:
+                current_response += tool_buffer
+
             # Save conversation ID
             try:
                 await self.conversation_manager.save_id(thread_id)
@@ -240,19 +329,18 @@ class GradioMCPInterface:
         except Exception as e:
             error_msg = f"Error during chat: {str(e)}"
             self._log(error_msg, "ERROR")
-            new_history = formatted_history + [
-                {"role": "user", "content": message},
-                {"role": "assistant", "content": error_msg}
-            ]
+            new_history[-1]["content"] = error_msg
             yield "", new_history, self._format_debug_logs()
             return
 
-        # Final state
-        final_history = formatted_history + [
-            {"role": "user", "content": message},
-            {"role": "assistant", "content": current_response}
-        ]
-        yield "", final_history, self._format_debug_logs()
+        # Final state - commit any batched message writes before finishing
+        try:
+            await self.conversation_manager.flush()
+        except Exception as e:
+            self._log(f"Failed to flush conversation messages: {str(e)}", "WARNING")
+
+        new_history[-1]["content"] = current_response
+        yield "", new_history, self._format_debug_logs()
 
 
 async def create_ui(config_path: Path = Path("config.json")) -> gr.Interface:
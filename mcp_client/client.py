@@ -1,21 +1,91 @@
 import os
+import logging
+import shutil
+import hashlib
+import functools
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any, Type
+from typing import List, Optional, Dict, Any, Type, Callable, Union, Deque, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 import json
+import time
 import asyncio
-from datetime import datetime
+from collections import deque
+from contextlib import AbstractAsyncContextManager, AsyncExitStack
 
+import anyio
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
 from langchain_core.tools import BaseTool, ToolException
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from jsonschema_pydantic import jsonschema_to_pydantic
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup - fall back to stdlib json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 ASYNC_INITIALIZE_TIMEOUT = 30  # 30 second timeout for async operations
 ASYNC_TOOL_CALL_TIMEOUT = 60  # 60 second timeout for tool calls
+MAX_DEBUG_LOGS = 10_000  # Debug log entries kept before the oldest are dropped
+
+# Errors a session or its transport raise when a server misbehaves or goes away
+_SESSION_ERRORS = (McpError, anyio.ClosedResourceError, anyio.BrokenResourceError, OSError)
+
+
+def _session_broken(error: BaseException) -> bool:
+    """Whether error means the session itself is unusable, not just the call"""
+    if isinstance(error, McpError):
+        error_data = getattr(error, "error", None)
+        return getattr(error_data, "code", None) == getattr(types, "CONNECTION_CLOSED", -32000)
+    return True
+
+
+class _LogFormatter:
+    """Debug log entry formatting shared by the clients and the manager"""
+    # Date/time prefix for log timestamps, reformatted once per second
+    _log_sec: int = 0
+    _log_sec_str: str = ''
+
+    def _timestamp(self) -> str:
+        """Current local time with milliseconds for log entries"""
+        t = time.time()
+        sec = int(t)
+        if sec != self._log_sec:
+            self._log_sec = sec
+            self._log_sec_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+        return f"{self._log_sec_str}.{int((t - sec) * 1000):03d}"
+
+    def _format_log_entry(self, message: Union[str, Callable[[], str]], args: tuple, level: str) -> str:
+        """Render a debug log entry from a message string or callable"""
+        if callable(message):
+            message = message()
+        elif args:
+            message = message % args
+        return f"[{self._timestamp()}] {level}: {message}"
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_sorted(obj: Any) -> bytes:
+    """Serialize obj to JSON bytes with sorted keys, for hashing"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS, default=str)
+    return json.dumps(obj, sort_keys=True, default=str).encode()
+
+
+# Pydantic models generated from tool input schemas, keyed by a hash of the
+# schema - building them is expensive and schemas rarely change
+_INPUT_MODEL_CACHE: Dict[str, Type[BaseModel]] = {}
 
 class MCPError(Exception):
     """Base exception class for MCP-related errors"""
@@ -49,6 +119,8 @@ class MCPConfig:
     # For SSE
     url: Optional[str] = None
     headers: Optional[Dict[str, str]] = None
+    # Debug log entries kept per client before the oldest are dropped
+    max_debug_logs: int = MAX_DEBUG_LOGS
 
     def validate(self) -> None:
         """Validate configuration"""
@@ -62,21 +134,48 @@ class MCPConfig:
             raise MCPConfigError("URL is required for SSE client")
 
 
-class MCPClientBase(ABC):
+# Validates a server's raw config and builds its MCPConfig in one call
+_CONFIG_ADAPTER = TypeAdapter(MCPConfig)
+
+
+class MCPClientBase(_LogFormatter, ABC):
     """Abstract base class for MCP clients"""
 
     def __init__(self, config: MCPConfig):
         self.config = config
-        self.tools: Optional[List[types.Tool]] = None
+        self._tools: Optional[List[types.Tool]] = None
+        # Derived views of self.tools, rebuilt whenever it is reassigned
+        self._tool_names: List[str] = []
+        self._tool_descriptions: Dict[str, str] = {}
         self._debug_mode = True  # Default enabled
-        self._debug_logs: List[str] = []
+        self._debug_logs: Deque[str] = deque(maxlen=config.max_debug_logs)
+        # Log shared with other clients, e.g. by MCPClientManager
+        self._log_sink: Optional[Deque[str]] = None
+        # Transport and session stay open between tool calls. They are owned
+        # by a runner task (see _run_session) on the loop that makes the calls
+        self.session: Optional[ClientSession] = None
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_stop: Optional[asyncio.Event] = None
+        # Serialises connecting, per event loop: (loop, lock)
+        self._session_lock: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = None
 
         try:
             self.config.validate()
         except MCPConfigError as e:
-            self._log(f"Configuration error: {str(e)}", "ERROR")
+            self._log(f"Configuration error: {str(e)}", level="ERROR")
             raise
 
+    @property
+    def tools(self) -> Optional[List[types.Tool]]:
+        """Tools reported by the server"""
+        return self._tools
+
+    @tools.setter
+    def tools(self, tools: Optional[List[types.Tool]]) -> None:
+        self._tools = tools
+        self._tool_names = [tool.name for tool in tools] if tools else []
+        self._tool_descriptions = {tool.name: tool.description for tool in tools} if tools else {}
+
     @abstractmethod
     async def initialize(self) -> None:
         """Initialize connection and fetch tools"""
@@ -87,35 +186,151 @@ class MCPClientBase(ABC):
         """Call a specific tool"""
         pass
 
+    @abstractmethod
+    def _open_transport(self) -> AbstractAsyncContextManager[Tuple[Any, Any]]:
+        """Context manager yielding the (read, write) streams to the server"""
+        pass
+
+    async def _run_session(self, ready: asyncio.Future, stop: asyncio.Event) -> None:
+        """Hold the transport and session open until stop is set
+
+        The transport and ClientSession enter anyio task groups, whose cancel
+        scopes must be exited by the task that entered them - so a single
+        task owns both for the session's whole lifetime.
+        """
+        session: Optional[ClientSession] = None
+        try:
+            async with self._open_transport() as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    if not ready.done():
+                        ready.set_result(session)
+                    await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                self._log(f"Session closed with error: {str(e)}", level="ERROR")
+        finally:
+            if session is not None and self.session is session:
+                self.session = None
+
+    async def _start_session(self) -> ClientSession:
+        """Start a runner task for a new session and wait until it is ready"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        stop = asyncio.Event()
+        self._session_stop = stop
+        self._session_task = loop.create_task(
+            self._run_session(ready, stop), name=f"mcp-session-{self.config.name}"
+        )
+        try:
+            async with asyncio.timeout(ASYNC_INITIALIZE_TIMEOUT):
+                return await ready
+        except BaseException:
+            await self._stop_session(cancel=True)
+            raise
+
+    async def _stop_session(self, cancel: bool = False) -> None:
+        """Tell the runner task to exit its contexts and wait for it"""
+        task, stop = self._session_task, self._session_stop
+        self._session_task = self._session_stop = None
+        if task is None:
+            return
+        owner_loop = task.get_loop()
+        if owner_loop is not asyncio.get_running_loop():
+            # The owning loop may be parked or gone, so ask it to stop the
+            # runner rather than waiting on it
+            try:
+                owner_loop.call_soon_threadsafe(task.cancel if cancel else stop.set)
+            except RuntimeError:  # Loop already closed
+                pass
+            return
+        if cancel:
+            task.cancel()
+        else:
+            stop.set()
+        await asyncio.wait([task])
+
+    def _session_usable(self, loop: asyncio.AbstractEventLoop) -> bool:
+        task = self._session_task
+        return (
+            self.session is not None
+            and task is not None
+            and not task.done()
+            and task.get_loop() is loop
+        )
+
+    async def _get_session(self) -> ClientSession:
+        """Session owned by the running loop, connecting (again) if needed
+
+        anyio streams only work on the loop that created them, and the UI
+        serves tool calls on a different loop than the one initialize() ran
+        on. A session that died or was dropped after an error is replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session_usable(loop):
+            return self.session
+        if self._session_lock is None or self._session_lock[0] is not loop:
+            self._session_lock = (loop, asyncio.Lock())
+        async with self._session_lock[1]:
+            if self._session_usable(loop):
+                return self.session
+            await self._stop_session()
+            self._log("Connecting session for %s", self.config.name)
+            return await self._start_session()
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
+        """Call a tool on the running loop's session, with timeout handling"""
+        try:
+            session = await self._get_session()
+            async with asyncio.timeout(ASYNC_TOOL_CALL_TIMEOUT):  # 60 second timeout for tool execution
+                return await session.call_tool(tool_name, arguments=arguments)
+        except asyncio.TimeoutError:
+            # A server that stopped answering is restarted on the next call
+            await self._stop_session(cancel=True)
+            self._log(f"Tool execution timed out at {ASYNC_TOOL_CALL_TIMEOUT} seconds", level="ERROR")
+            raise MCPConnectionError(f"Tool execution timed out at {ASYNC_TOOL_CALL_TIMEOUT} seconds")
+        except (*_SESSION_ERRORS, ExceptionGroup) as e:
+            if _session_broken(e):
+                # Drop the dead session so the next call reconnects
+                await self._stop_session()
+            self._log(f"Tool execution failed: {str(e)}", level="ERROR")
+            raise MCPToolError(f"Tool execution failed: {str(e)}")
+
+    async def close(self) -> None:
+        """Close the session and its transport"""
+        await self._stop_session()
+
+    async def __aenter__(self) -> "MCPClientBase":
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
     def create_langchain_tool(self, tool_schema: types.Tool) -> BaseTool:
         """Create a LangChain tool from MCP tool schema"""
-        self._log(f"Creating LangChain tool for {tool_schema.name}")
+        self._log("Creating LangChain tool for %s", tool_schema.name)
 
         try:
-            input_model = jsonschema_to_pydantic(tool_schema.inputSchema)
-
-            class McpTool(BaseTool):
-                name: str = tool_schema.name
-                description: str = tool_schema.description
-                args_schema: Type[BaseModel] = input_model
-                mcp_client: MCPClientBase = self
-
-                def _run(self, **kwargs):
-                    raise NotImplementedError("Only async operations are supported")
-
-                async def _arun(self, **kwargs):
-                    try:
-                        result = await self.mcp_client.call_tool(self.name, kwargs)
-                        if result.isError:
-                            raise ToolException(result.content)
-                        return result.content
-                    except Exception as e:
-                        self.mcp_client._log(f"Tool execution failed: {str(e)}", "ERROR")
-                        raise ToolException(str(e))
-
-            return McpTool()
+            schema_key = hashlib.blake2b(
+                _json_dumps_sorted(tool_schema.inputSchema)
+            ).hexdigest()
+            input_model = _INPUT_MODEL_CACHE.get(schema_key)
+            if input_model is None:
+                input_model = jsonschema_to_pydantic(tool_schema.inputSchema)
+                _INPUT_MODEL_CACHE[schema_key] = input_model
+
+            return _McpTool(
+                name=tool_schema.name,
+                description=tool_schema.description or "",
+                args_schema=input_model,
+                mcp_client=self
+            )
         except Exception as e:
-            self._log(f"Failed to create LangChain tool: {str(e)}", "ERROR")
+            self._log(f"Failed to create LangChain tool: {str(e)}", level="ERROR")
             raise MCPToolError(f"Failed to create tool {tool_schema.name}: {str(e)}")
 
     def get_langchain_tools(self) -> List[BaseTool]:
@@ -132,42 +347,61 @@ class MCPClientBase(ABC):
 
     def get_debug_logs(self) -> List[str]:
         """Get current debug logs"""
-        return self._debug_logs
+        return list(self._debug_logs)
 
     def clear_debug_logs(self) -> None:
         """Clear debug logs"""
-        self._debug_logs = []
+        self._debug_logs.clear()
+
+    def _log(self, message: Union[str, Callable[[], str]], *args: Any, level: str = "INFO") -> None:
+        """Add a log message if debug mode is enabled
 
-    def _log(self, message: str, level: str = "INFO") -> None:
-        """Add a log message if debug mode is enabled"""
-        if self._debug_mode:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            log_entry = f"[{timestamp}] {level}: {message}"
-            self._debug_logs.append(log_entry)
+        Formatting is deferred until after the debug check: pass either a
+        %-style format string with args, or a callable returning the message.
+        """
+        if not self._debug_mode:
+            return
+        log_entry = self._format_log_entry(message, args, level)
+        self._debug_logs.append(log_entry)
+        if self._log_sink is not None:
+            self._log_sink.append(log_entry)
+
+    def set_log_sink(self, sink: Optional[Deque[str]]) -> None:
+        """Also append every log entry to sink"""
+        self._log_sink = sink
 
     def get_tool_names(self) -> List[str]:
         """Get list of available tool names"""
-        if not self.tools:
-            return []
-        return [tool.name for tool in self.tools]
+        return self._tool_names
 
     def get_tool_descriptions(self) -> Dict[str, str]:
         """Get mapping of tool names to descriptions"""
-        if not self.tools:
-            return {}
-        return {tool.name: tool.description for tool in self.tools}
+        return self._tool_descriptions
+
+
+class _McpTool(BaseTool):
+    """LangChain tool that forwards calls to an MCP client"""
+    mcp_client: MCPClientBase
+
+    def _run(self, **kwargs):
+        raise NotImplementedError("Only async operations are supported")
+
+    async def _arun(self, **kwargs):
+        try:
+            result = await self.mcp_client.call_tool(self.name, kwargs)
+            if result.isError:
+                raise ToolException(result.content)
+            return result.content
+        except Exception as e:
+            self.mcp_client._log(f"Tool execution failed: {str(e)}", level="ERROR")
+            raise ToolException(str(e))
 
 
 class MCPStdioClient(MCPClientBase):
     """STDIO-based MCP client"""
 
-    async def initialize(self) -> None:
-        if not self.config.command:
-            raise MCPConfigError("Command is required for STDIO client")
-
-        # Start initializing STDIO client
-        print(f"\nInitializing STDIO client for {self.config.command}")
-        self._log(f"Initializing STDIO client for {self.config.command}")
+    def __init__(self, config: MCPConfig):
+        super().__init__(config)
 
         # Create server parameters with explicit env settings -
         # These force Python to run in unbuffered mode
@@ -182,142 +416,190 @@ class MCPStdioClient(MCPClientBase):
         if self.config.env:
             env.update(self.config.env)
 
-        server_params = StdioServerParameters(
+        # Built once - StdioServerParameters is a pydantic model
+        self._server_params = StdioServerParameters(
             command=self.config.command,
             args=self.config.args or [],
             env=env
         )
 
-        print(f"Creating stdio client with command: {server_params.command}")
-        print(f"Working directory: {os.getcwd()}")
-        # print(f"Environment PATH: {env.get('PATH')}") # Uncomment to debug PATH issues
+    def _open_transport(self) -> AbstractAsyncContextManager[Tuple[Any, Any]]:
+        return stdio_client(self._server_params)
+
+    async def initialize(self) -> None:
+        if not self.config.command:
+            raise MCPConfigError("Command is required for STDIO client")
+
+        # Start initializing STDIO client
+        logger.info("Initializing STDIO client for %s", self.config.command)
+        self._log(f"Initializing STDIO client for {self.config.command}")
+
+        server_params = self._server_params
+        logger.debug("Creating stdio client with command: %s", server_params.command)
+        logger.debug("Working directory: %s", os.getcwd())
+        # logger.debug("Environment PATH: %s", server_params.env.get('PATH')) # Uncomment to debug PATH issues
 
         try:
+            session = await self._start_session()
+            self._log("Session initialized, listing tools...")
             # Add timeout for operations
             async with asyncio.timeout(ASYNC_INITIALIZE_TIMEOUT):
-                async with stdio_client(server_params) as (read, write):
-                    print("Stdio streams established")
-                    async with ClientSession(read, write) as session:
-                        self._log("Session created, initializing...")
-                        await session.initialize()
-                        self._log("Session initialized, listing tools...")
-                        tools_result: types.ListToolsResult = await session.list_tools()
-                        self.tools = tools_result.tools
-                        self._log(f"Tools loaded: {[tool.name for tool in self.tools]}")
-                        print(f"Tools loaded: {[tool.name for tool in self.tools]}")
+                tools_result: types.ListToolsResult = await session.list_tools()
+                self.tools = tools_result.tools
+                tool_names = self.get_tool_names()
+                self._log("Tools loaded: %s", tool_names)
+                logger.debug("Tools loaded: %s", tool_names)
+
+            # The loop running initialize() may never run again (the UI parks
+            # it in launch()), so don't leave the session bound to it. Tool
+            # calls open their own through _get_session()
+            await self._stop_session()
 
         except asyncio.TimeoutError:
+            await self.close()
             error_msg = f"Timeout, {ASYNC_INITIALIZE_TIMEOUT} seconds, while initializing STDIO client"
-            self._log(error_msg, "ERROR")
+            self._log(error_msg, level="ERROR")
             raise MCPConnectionError(error_msg)
-        except Exception as e:
+        except (*_SESSION_ERRORS, ExceptionGroup) as e:
+            await self.close()
             error_msg = f"Failed to initialize STDIO client: {str(e)}"
-            self._log(error_msg, "ERROR")
+            self._log(error_msg, level="ERROR")
             raise MCPConnectionError(error_msg)
+        except BaseException:
+            await self.close()
+            raise
 
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
         """Call a specific tool with timeout handling"""
         if not self.tools:
             raise MCPToolError("Client not initialized")
 
-        env = {'PYTHONUNBUFFERED': '1'}
-        if self.config.env:
-            env.update(self.config.env)
-
-        server_params = StdioServerParameters(
-            command=self.config.command,
-            args=self.config.args or [],
-            env=env)
-
-        try:
-            async with asyncio.timeout(ASYNC_TOOL_CALL_TIMEOUT):  # 60 second timeout for tool execution
-                async with stdio_client(server_params) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        result = await session.call_tool(tool_name, arguments=arguments)
-                        return result
-        except asyncio.TimeoutError:
-            self._log(f"Tool execution timed out at {ASYNC_TOOL_CALL_TIMEOUT} seconds", "ERROR")
-            raise MCPConnectionError(f"Tool execution timed out at {ASYNC_TOOL_CALL_TIMEOUT} seconds")
-        except Exception as e:
-            self._log(f"Tool execution failed: {str(e)}", "ERROR")
-            raise MCPToolError(f"Tool execution failed: {str(e)}")
+        # Reuses this loop's session - no subprocess spawn per call
+        return await self._call_tool(tool_name, arguments)
 
-class MCPClientManager:
+class MCPClientManager(_LogFormatter):
     """Manager class for handling multiple MCP clients"""
+
     def __init__(self, config_path: Path):
         self.config_path = config_path
         self.clients: Dict[str, MCPClientBase] = {}
         self._debug_mode = True
-        print(f"Initialized with config path: {config_path}")
-
-    @staticmethod
-    def _get_python_env(server_config: Dict[str, Any]) -> Dict[str, str]:
+        # Every client's log entries, in the order they were logged
+        self._aggregated_logs: Deque[str] = deque(maxlen=MAX_DEBUG_LOGS)
+        # Process environment snapshot that each stdio server's env is layered
+        # on - taken in initialize() so variables loaded after construction
+        # (e.g. from .env) still reach the servers
+        self._base_env: Dict[str, str] = {}
+        # Owns every connected client until close()
+        self._exit_stack = AsyncExitStack()
+        logger.debug("Initialized with config path: %s", config_path)
+
+    def _get_python_env(self, server_env: Optional[Dict[str, str]]) -> Dict[str, str]:
         """Get Python environment variables from config"""
-        env = os.environ.copy()
-        if server_config.get("env"):
-            env.update(server_config["env"])
-        return env
+        return {**self._base_env, **(server_env or {})}
 
     @staticmethod
+    @functools.cache
     def _verify_command(command: str) -> bool:
-        """Verify command exists either as full path or in PATH"""
+        """Verify command exists either as full path or in PATH
+
+        Cached per command, since most servers share a launcher such as
+        npx or uvx and each PATH walk is a series of stat() calls.
+        """
         # If it's a full path, check directly
         if os.path.isabs(command):
             return Path(command).exists()
 
         # Otherwise check if it's in PATH
-        import shutil
         return shutil.which(command) is not None
 
     async def initialize(self) -> None:
         """Initialize all clients from config file"""
+        # Re-initializing must not leave the previous servers running
+        if self.clients:
+            await self.close()
+
         try:
-            with open(self.config_path) as f:
-                config = json.load(f)
-        except Exception as e:
+            with open(self.config_path, "rb") as f:
+                config = _json_loads(f.read())
+        except (OSError, ValueError) as e:
             raise MCPConfigError(f"Failed to load config from {self.config_path}: {str(e)}")
 
+        self._base_env = dict(os.environ)
+        # Build every client first, then connect them all concurrently so
+        # startup takes as long as the slowest server rather than the sum
+        pending: List[tuple[str, MCPClientBase]] = []
         for server_name, server_config in config.get("mcpServers", {}).items():
-            print(f"\nInitializing server: {server_name}")
-
-            client_type = server_config.get("type")
-
-            client_config = MCPConfig(
-                type=client_type,
-                name=server_name,
-                command=server_config.get("command"),
-                args=server_config.get("args", []),
-                env=self._get_python_env(server_config) if client_type == "stdio" else None,
-                url=server_config.get("url"),
-                headers=server_config.get("headers", {})
-            )
+            logger.info("Initializing server: %s", server_name)
 
             try:
+                # A bad entry only skips its own server
+                client_config = _CONFIG_ADAPTER.validate_python({
+                    "type": server_config.get("type"),
+                    "name": server_name,
+                    "command": server_config.get("command"),
+                    "args": server_config.get("args", []),
+                    "env": server_config.get("env"),
+                    "url": server_config.get("url"),
+                    "headers": server_config.get("headers", {}),
+                    "max_debug_logs": server_config.get("maxDebugLogs", MAX_DEBUG_LOGS),
+                })
+
+                client_type = client_config.type
+                client_config.env = self._get_python_env(client_config.env) if client_type == "stdio" else None
+
                 client: MCPClientBase
                 if client_type == "stdio":
                     if not client_config.command or not self._verify_command(client_config.command):
-                        print(f"Invalid command configuration {client_config.command} for {server_name}")
+                        logger.warning("Invalid command configuration %s for %s", client_config.command, server_name)
                         continue
                     client = MCPStdioClient(client_config)
                 elif client_type == "sse":
                     if not client_config.url:
-                        print(f"No URL specified for {server_name}")
+                        logger.warning("No URL specified for %s", server_name)
                         continue
                     client = MCPSSEClient(client_config)
                 else:
-                    self._log(f"Unknown client type: {client_type} - Will ignore", "ERROR")
+                    self._log(f"Unknown client type: {client_type} - Will ignore", level="ERROR")
                     raise MCPConfigError(f"Unknown client type: {client_type}")
 
-                await client.initialize()
-                self.clients[server_name] = client
-                print(f"Successfully initialized {server_name}")
+                client.set_log_sink(self._aggregated_logs)
+                pending.append((server_name, client))
+
+            except (MCPError, ValidationError) as e:
+                logger.error("Failed to initialize client %s: %s", server_name, e,
+                             exc_info=logger.isEnabledFor(logging.DEBUG))
+                self._log(f"Failed to initialize client {server_name}: {str(e)}", level="ERROR")
+
+        results = await asyncio.gather(
+            *(client.initialize() for _, client in pending),
+            return_exceptions=True
+        )
+        for (server_name, client), result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.error("Failed to initialize client %s: %s", server_name, result,
+                             exc_info=result if logger.isEnabledFor(logging.DEBUG) else None)
+                self._log(f"Failed to initialize client {server_name}: {str(result)}", level="ERROR")
+                continue
+
+            self._exit_stack.push_async_exit(client)
+            self.clients[server_name] = client
+            logger.info("Successfully initialized %s", server_name)
+
+    async def close(self) -> None:
+        """Close every client's session and transport"""
+        self.clients.clear()
+        try:
+            await self._exit_stack.aclose()
+        except Exception as e:
+            logger.error("Failed to close MCP clients: %s", e)
 
-            except Exception as e:
-                print(f"Failed to initialize client {server_name}: {str(e)}")
-                self._log(f"Failed to initialize client {server_name}: {str(e)}", "ERROR")
-                import traceback
-                traceback.print_exc()
+    async def __aenter__(self) -> "MCPClientManager":
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
 
     def get_all_langchain_tools(self) -> List[BaseTool]:
         """Get all tools as LangChain tools"""
@@ -325,29 +607,31 @@ class MCPClientManager:
         for name, client in self.clients.items():
             try:
                 client_tools = client.get_langchain_tools()
-                print(f"Got {len(client_tools)} tools from {name}: {[t.name for t in client_tools]}")
-                self._log(f"Got {len(client_tools)} tools from {name}: {[t.name for t in client_tools]}")
+                self._log(lambda: f"Got {len(client_tools)} tools from {name}: {[t.name for t in client_tools]}")
                 tools.extend(client_tools)
-            except Exception as e:
-                print(f"Error getting tools from {name}: {str(e)}")
-                self._log(f"Failed to get tools from {name}: {str(e)}", "ERROR")
+            except MCPError as e:
+                logger.error("Error getting tools from %s: %s", name, e)
+                self._log(f"Failed to get tools from {name}: {str(e)}", level="ERROR")
                 continue
 
         if not tools:
-            print("Warning: No tools were loaded from any clients")
+            logger.warning("No tools were loaded from any clients")
         return tools
 
-    def _log(self, message: str, level: str = "INFO") -> None:
+    def _log(self, message: Union[str, Callable[[], str]], *args: Any, level: str = "INFO") -> None:
         """Log message to all clients"""
+        if not self._debug_mode:
+            return
+        # Format once and record it once in the aggregated log, rather than
+        # once per client through each client's sink
+        log_entry = self._format_log_entry(message, args, level)
         for client in self.clients.values():
-            client._log(message, level)
+            client._debug_logs.append(log_entry)
+        self._aggregated_logs.append(log_entry)
 
     def get_all_debug_logs(self) -> List[str]:
         """Get debug logs from all clients"""
-        all_logs = []
-        for client in self.clients.values():
-            all_logs.extend(client.get_debug_logs())
-        return all_logs
+        return list(self._aggregated_logs)
 
     def toggle_debug(self) -> None:
         """Toggle debug mode for all clients"""
@@ -357,6 +641,7 @@ class MCPClientManager:
 
     def clear_all_debug_logs(self) -> None:
         """Clear debug logs from all clients"""
+        self._aggregated_logs.clear()
         for client in self.clients.values():
             client.clear_debug_logs()
 
@@ -364,55 +649,50 @@ class MCPClientManager:
 class MCPSSEClient(MCPClientBase):
     """SSE-based MCP client implementation using official MCP package"""
 
-    def __init__(self, config: MCPConfig):
-        super().__init__(config)
-        self.session: Optional[ClientSession] = None
+    def _open_transport(self) -> AbstractAsyncContextManager[Tuple[Any, Any]]:
+        return sse_client(self.config.url, headers=self.config.headers or {})
 
     async def initialize(self) -> None:
         """Initialize SSE connection and fetch tools"""
         if not self.config.url:
-            self._log("URL is required for SSE client", "ERROR")
+            self._log("URL is required for SSE client", level="ERROR")
             raise MCPConfigError("URL is required for SSE client")
 
         self._log(f"Initializing SSE client for {self.config.url}")
 
         try:
-            # Set up headers
-            headers = self.config.headers or {}
-
-            # Initialize connection with timeout
+            session = await self._start_session()
+            self._log("Session initialized, listing tools...")
+            # Fetch tools with timeout
             async with asyncio.timeout(ASYNC_INITIALIZE_TIMEOUT):  # 30 second timeout
-                async with sse_client(self.config.url, headers=headers) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        self._log("Session created, initializing...")
-                        await session.initialize()
-                        self._log("Session initialized, listing tools...")
-                        tools_result: types.ListToolsResult = await session.list_tools()
-                        self.tools = tools_result.tools
-                        self._log(f"Tools loaded: {[tool.name for tool in self.tools]}")
-                        print(f"Tools loaded: {[tool.name for tool in self.tools]}")
+                tools_result: types.ListToolsResult = await session.list_tools()
+                self.tools = tools_result.tools
+                tool_names = self.get_tool_names()
+                self._log("Tools loaded: %s", tool_names)
+                logger.debug("Tools loaded: %s", tool_names)
+
+            # The loop running initialize() may never run again (the UI parks
+            # it in launch()), so don't leave the session bound to it. Tool
+            # calls open their own through _get_session()
+            await self._stop_session()
 
         except asyncio.TimeoutError:
-            self._log(f"Timeout,{ASYNC_INITIALIZE_TIMEOUT} seconds, while initializing SSE client", "ERROR")
+            await self.close()
+            self._log(f"Timeout,{ASYNC_INITIALIZE_TIMEOUT} seconds, while initializing SSE client", level="ERROR")
             raise MCPConnectionError("Timeout while initializing SSE client")
-        except Exception as e:
-            self._log(f"Failed to initialize SSE client: {str(e)}", "ERROR")
+        except (*_SESSION_ERRORS, ExceptionGroup) as e:
+            await self.close()
+            self._log(f"Failed to initialize SSE client: {str(e)}", level="ERROR")
             raise MCPConnectionError(f"Failed to initialize SSE client: {str(e)}")
+        except BaseException:
+            await self.close()
+            raise
 
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
         """Call a specific tool via SSE"""
         if not self.tools:
-            self._log(f"SSE Client {tool_name} not initialized", "ERROR")
+            self._log(f"SSE Client {tool_name} not initialized", level="ERROR")
             raise MCPToolError(f"SSE Client {tool_name} not initialized")
 
-        try:
-            # Create new session for each tool call since we need fresh streams
-            async with sse_client(self.config.url, headers=self.config.headers) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(tool_name, arguments=arguments)
-                    return result
-
-        except Exception as e:
-            self._log(f"Tool execution failed: {str(e)}", "ERROR")
-            raise MCPToolError(f"Tool execution failed: {str(e)}")
\ No newline at end of file
+        # Reuses this loop's session - no reconnect per call
+        return await self._call_tool(tool_name, arguments)
\ No newline at end of file
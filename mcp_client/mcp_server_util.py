@@ -1,66 +1,81 @@
+import asyncio
+import platform
+import shutil
+from typing import Dict, Optional, Tuple
+
+# shutil.which results by command name - PATH is only walked once per command
+_WHICH_CACHE: Dict[str, Optional[str]] = {}
+
+
+def _which(cmd: str) -> Optional[str]:
+    """Cached shutil.which lookup"""
+    if cmd not in _WHICH_CACHE:
+        _WHICH_CACHE[cmd] = shutil.which(cmd)
+    return _WHICH_CACHE[cmd]
+
+
+# Windows uses .cmd extension for batch scripts
+_NPX_CMD = 'npx.cmd' if platform.system() == 'Windows' else 'npx'
+
+
+async def _get_version(path: str) -> Tuple[int, str]:
+    """Run `<path> --version` without blocking the event loop"""
+    proc = await asyncio.create_subprocess_exec(
+        path, '--version',
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode().strip() or stderr.decode().strip()
+
+
 async def verify_uvx_installation():
     """Verify that uvx is properly installed and accessible."""
-    try:
-        import subprocess
-        result = subprocess.run(['uvx', '--version'],
-                              capture_output=True,
-                              text=True)
-        print(f"UVX version check output: {result.stdout}")
-        return True
-    except FileNotFoundError:
+    path = _which('uvx')
+    if path is None:
         print("UVX not found in PATH")
         return False
+    try:
+        returncode, version_output = await _get_version(path)
+        print(f"UVX version check output: {version_output}")
+        return returncode == 0
     except Exception as e:
         print(f"Error checking UVX: {str(e)}")
         return False
 
 async def verify_npx_installation():
     """Verify that npx is properly installed and accessible."""
-    import subprocess
-    import platform
-
-    # Determine the command based on the operating system
-    if platform.system() == 'Windows':
-        cmd = 'npx.cmd'  # Windows uses .cmd extension for batch scripts
-    else:
-        cmd = 'npx'
-
+    path = _which(_NPX_CMD)
+    if path is None:
+        print(f"{_NPX_CMD} not found in PATH")
+        return False
     try:
-        result = subprocess.run([cmd, '--version'],
-                                capture_output=True,
-                                text=True)
-        if result.returncode == 0:
-            version_output = result.stdout.strip() or result.stderr.strip()
+        returncode, version_output = await _get_version(path)
+        if returncode == 0:
             print(f"NPX version check output: {version_output}")
             return True
         else:
-            print(f"Failed to get NPX version: {result.stderr.strip()}")
+            print(f"Failed to get NPX version: {version_output}")
             return False
-    except FileNotFoundError:
-        print(f"{cmd} not found in PATH")
-        return False
     except Exception as e:
         print(f"Error checking NPX: {str(e)}")
         return False
 
 async def verify_python_installation():
     """Verify that Python is properly installed and accessible as 'python' or 'python3'."""
-    import subprocess
-
     commands = ['python', 'python3']
     for cmd in commands:
+        path = _which(cmd)
+        if path is None:
+            print(f"{cmd} not found in PATH")
+            continue
         try:
-            result = subprocess.run([cmd, '--version'],
-                                    capture_output=True,
-                                    text=True)
-            version_output = result.stdout.strip() or result.stderr.strip()
-            if result.returncode == 0:
+            returncode, version_output = await _get_version(path)
+            if returncode == 0:
                 print(f"{cmd} version check output: {version_output}")
                 return True
             else:
                 print(f"Failed to get version from {cmd}: {version_output}")
-        except FileNotFoundError:
-            print(f"{cmd} not found in PATH")
         except Exception as e:
             print(f"Error checking {cmd}: {str(e)}")
-    return False
\ No newline at end of file
+    return False
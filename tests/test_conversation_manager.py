@@ -0,0 +1,156 @@
+import sqlite3
+
+import pytest
+
+from cli import ConversationManager
+
+
+# Schema from before messages cascaded on conversation delete
+LEGACY_SCHEMA = '''
+    CREATE TABLE conversations (
+        id TEXT PRIMARY KEY,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        title TEXT,
+        metadata TEXT
+    );
+    CREATE TABLE messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+    );
+    CREATE INDEX idx_conversation_id ON messages(conversation_id);
+'''
+
+
+def _create_legacy_db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO conversations (id, title) VALUES ('kept', 'Kept')")
+    conn.executemany(
+        'INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)',
+        [('kept', 'user', 'hello'), ('orphan', 'user', 'lost parent'), (None, 'user', 'no parent')]
+    )
+    conn.commit()
+    conn.close()
+
+
+async def test_legacy_messages_table_is_rebuilt_with_cascade(tmp_path):
+    db_path = tmp_path / 'conversations.db'
+    _create_legacy_db(db_path)
+
+    manager = ConversationManager(db_path)
+    try:
+        assert not await manager._run(manager._messages_table_needs_rebuild)
+        conn = manager._conn
+        assert conn.execute('PRAGMA foreign_key_check').fetchall() == []
+        # Every message survives, and orphans get a parent conversation
+        assert conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 3
+        assert conn.execute(
+            "SELECT id FROM conversations WHERE id = 'orphan'"
+        ).fetchone() == ('orphan',)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_messages_conv_ts' in indexes
+        assert 'idx_conversation_id' not in indexes
+
+        await manager.delete_conversation('kept')
+        assert await manager.get_conversation_messages('kept') == []
+    finally:
+        await manager.close()
+
+    # Reopening finds the migrated table and leaves it alone
+    manager = ConversationManager(db_path)
+    try:
+        assert not await manager._run(manager._messages_table_needs_rebuild)
+        assert manager.get_db_stats()['messages'] == 2
+    finally:
+        await manager.close()
+
+
+async def test_message_without_conversation_adds_no_conversation(tmp_path):
+    manager = ConversationManager(tmp_path / 'conversations.db')
+    try:
+        await manager.save_message(None, 'user', 'no conversation')
+        await manager.save_message('real', 'user', 'hello')
+        await manager.flush()
+        ids = [row[0] for row in await manager.list_conversations()]
+        assert ids == ['real']
+        assert manager.get_db_stats()['messages'] == 2
+    finally:
+        await manager.close()
+
+
+async def test_rejected_messages_are_dropped(tmp_path):
+    manager = ConversationManager(tmp_path / 'conversations.db')
+    try:
+        # content is NOT NULL, so this batch can never be written
+        await manager.save_message('a', 'user', None)
+        with pytest.raises(sqlite3.IntegrityError):
+            await manager.flush()
+        assert manager._pending == []
+
+        # Later reads, deletes and writes are unaffected
+        assert await manager.get_conversation_messages('a') == []
+        await manager.delete_conversation('a')
+        await manager.save_message('b', 'user', 'hello')
+        await manager.flush()
+        assert await manager.get_conversation_messages('b') != []
+    finally:
+        await manager.close()
+
+
+async def test_messages_are_retried_while_database_is_locked(tmp_path):
+    db_path = tmp_path / 'conversations.db'
+    manager = ConversationManager(db_path)
+    other = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        await manager._run(lambda: manager._conn.execute('PRAGMA busy_timeout=0'))
+        other.execute('BEGIN IMMEDIATE')
+        await manager.save_message('a', 'user', 'hello')
+        with pytest.raises(sqlite3.OperationalError):
+            await manager.flush()
+        # A read does not fail because of the pending write
+        assert await manager.get_conversation_messages('a') == []
+        assert manager._pending == [('a', 'user', 'hello')]
+
+        other.execute('ROLLBACK')
+        await manager.flush()
+        assert manager._pending == []
+        rows = await manager.get_conversation_messages('a')
+        assert [(role, content) for role, content, _ in rows] == [('user', 'hello')]
+    finally:
+        other.close()
+        await manager.close()
+
+
+async def test_database_is_opened_on_first_use(tmp_path):
+    db_path = tmp_path / 'conversations.db'
+    _create_legacy_db(db_path)
+
+    manager = ConversationManager(db_path)
+    try:
+        # Nothing touches the database until the first call
+        assert manager._conn is None
+        assert await manager.get_last_id() is not None
+        assert manager._conn is not None
+    finally:
+        await manager.close()
+
+
+async def test_stats_follow_writes_through_the_manager(tmp_path):
+    manager = ConversationManager(tmp_path / 'conversations.db')
+    try:
+        await manager.save_id('c1')
+        await manager.save_message('c1', 'user', 'hello')
+        await manager.flush()
+        assert manager.get_db_stats()['conversations'] == 1
+        assert (await manager.get_db_stats_async())['messages'] == 1
+
+        await manager.delete_conversation('c1')
+        assert manager.get_db_stats()['conversations'] == 0
+        assert (await manager.get_db_stats_async())['messages'] == 0
+    finally:
+        await manager.close()